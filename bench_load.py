@@ -0,0 +1,167 @@
+"""
+End-to-end load benchmark against the local Graph API stand-in (mock_graph.py).
+
+For each campaign size it measures:
+  - POST /send (upload + queueing) time and DB queries
+  - dispatcher throughput (messages/sec), Graph call latency p50/p99, DB queries
+  - POST /webhook latency p50/p99 for one 'delivered' status per message,
+    plus time and DB queries to apply the inbox
+  - GET /report/<id> time and DB queries
+
+    python bench_load.py                     # 1k, 10k, 100k recipients
+    python bench_load.py 5000 --latency-ms 30 --throttle-rate 0.01
+
+Uses a throwaway SQLite DB unless BENCH_DATABASE_URL is set. The mock runs
+in-process unless --graph-url points at a separately started mock_graph.py.
+"""
+import argparse, contextlib, io, logging, os, sys, tempfile, threading, time
+
+ap = argparse.ArgumentParser()
+ap.add_argument('sizes', nargs='*', type=int, default=[1_000, 10_000, 100_000])
+ap.add_argument('--latency-ms', type=float, default=20.0)
+ap.add_argument('--error-rate', type=float, default=0.0)
+ap.add_argument('--throttle-rate', type=float, default=0.0)
+ap.add_argument('--graph-url', default=None, help='use an already running mock_graph.py')
+ap.add_argument('--port', type=int, default=8901)
+args = ap.parse_args()
+
+tmpdir = tempfile.mkdtemp(prefix='wa-bench-')
+os.environ['DATABASE_URL'] = os.environ.get('BENCH_DATABASE_URL', f"sqlite:///{os.path.join(tmpdir, 'bench.db')}")
+os.environ['WHATSAPP_TOKEN'] = 'bench-token'
+os.environ['WHATSAPP_GRAPH_URL'] = args.graph_url or f"http://127.0.0.1:{args.port}"
+os.environ['REPORT_CACHE_DIR'] = os.path.join(tmpdir, 'report_cache')
+# measure the pipeline, not our own limiter
+os.environ.setdefault('WA_RATE_PER_SECOND', '100000')
+os.environ.setdefault('WA_PAIR_INTERVAL_SECONDS', '0')
+
+import mock_graph
+logging.getLogger('whatsapp').setLevel(logging.WARNING)   # sampled per-send log lines would skew timings
+from sqlalchemy import event
+import app as wa
+import dispatcher
+
+
+def start_mock():
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)   # no access log per request
+    mock_graph.CONFIG.update(latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 4,
+                             error_rate=args.error_rate, throttle_rate=args.throttle_rate)
+    server = make_server('127.0.0.1', args.port, mock_graph.mock, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *a, **k):
+        self.count += 1
+
+    @contextlib.contextmanager
+    def measure(self):
+        start = self.count
+        box = {}
+        yield box
+        box['queries'] = self.count - start
+
+
+def pct(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))] * 1000
+
+
+def bench(size, client, counter, api_latencies):
+    numbers = [str(9000000000 + i) for i in range(size)]
+    row = {'size': size}
+
+    # 1) /send
+    upload = io.BytesIO("\n".join(numbers).encode())
+    with counter.measure() as q:
+        t = time.perf_counter()
+        resp = client.post('/send', data={'phone_csv': (upload, 'numbers.csv'), 'history_title': f'bench {size}',
+                                          'message_title': 'bench', 'message_body': 'bench', 'default_country_code': '91',
+                                          'google_drive_link': f"{os.environ['WHATSAPP_GRAPH_URL']}/_media/header.png"},
+                           content_type='multipart/form-data')
+        row['send_s'] = time.perf_counter() - t
+    row['send_q'] = q['queries']
+    campaign_id = resp.get_json()['campaign_id']
+
+    # 2) dispatcher
+    api_latencies.clear()
+    with wa.app.app_context(), counter.measure() as q, contextlib.redirect_stdout(io.StringIO()):
+        job = wa.claim_dispatch_job('bench')
+        t = time.perf_counter()
+        dispatcher.dispatch_job(job)
+        elapsed = time.perf_counter() - t
+    row['dispatch_q'] = q['queries']
+    row['msg_s'] = size / elapsed
+    lat = list(api_latencies)
+    row['api_p50'], row['api_p99'] = pct(lat, 50), pct(lat, 99)
+
+    # 3) webhooks: one 'delivered' per sent message
+    with wa.app.app_context():
+        sent = [(r.whatsapp_message_id, r.phone_number) for r in
+                wa.db.session.query(wa.MessageRecord.whatsapp_message_id, wa.MessageRecord.phone_number)
+                .filter(wa.MessageRecord.history_id == campaign_id, wa.MessageRecord.whatsapp_message_id.isnot(None))]
+    hook_lat = []
+    for wamid, phone in sent:
+        payload = mock_graph.status_payload(wamid, phone, 'delivered', wa.WHATSAPP_PHONE_NUMBER_ID)
+        t = time.perf_counter()
+        client.post('/webhook', json=payload)
+        hook_lat.append(time.perf_counter() - t)
+    row['hook_p50'], row['hook_p99'] = pct(hook_lat, 50), pct(hook_lat, 99)
+    with wa.app.app_context(), counter.measure() as q, contextlib.redirect_stdout(io.StringIO()):
+        t = time.perf_counter()
+        while wa.process_webhook_inbox('bench'):
+            pass
+        row['apply_s'] = time.perf_counter() - t
+    row['apply_q'] = q['queries']
+
+    # 4) report page
+    with counter.measure() as q:
+        t = time.perf_counter()
+        client.get(f'/report/{campaign_id}')
+        row['report_ms'] = (time.perf_counter() - t) * 1000
+    row['report_q'] = q['queries']
+    return row
+
+
+def main():
+    if not args.graph_url:
+        start_mock()
+
+    api_latencies = []
+    real_send = wa.send_whatsapp_message
+
+    def timed_send(*a, **k):
+        t = time.perf_counter()
+        try:
+            return real_send(*a, **k)
+        finally:
+            api_latencies.append(time.perf_counter() - t)
+    wa.send_whatsapp_message = timed_send
+
+    counter = QueryCounter()
+    with wa.app.app_context():
+        event.listen(wa.db.engine, 'before_cursor_execute', counter)
+
+    client = wa.app.test_client()
+    with client.session_transaction() as s:
+        s['logged_in'] = True
+
+    header = (f"{'recipients':>10} {'send s':>7} {'send q':>7} {'msg/s':>8} {'api p50':>8} {'api p99':>8} "
+              f"{'disp q':>7} {'hook p50':>9} {'hook p99':>9} {'apply s':>8} {'apply q':>8} {'report ms':>10} {'rep q':>6}")
+    print(f"DB: {os.environ['DATABASE_URL']}  Graph: {os.environ['WHATSAPP_GRAPH_URL']}  (latencies in ms)")
+    print(header)
+    for size in args.sizes:
+        r = bench(size, client, counter, api_latencies)
+        print(f"{r['size']:>10} {r['send_s']:>7.2f} {r['send_q']:>7} {r['msg_s']:>8.0f} {r['api_p50']:>8.1f} {r['api_p99']:>8.1f} "
+              f"{r['dispatch_q']:>7} {r['hook_p50']:>9.2f} {r['hook_p99']:>9.2f} {r['apply_s']:>8.2f} {r['apply_q']:>8} "
+              f"{r['report_ms']:>10.1f} {r['report_q']:>6}")
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
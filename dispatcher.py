@@ -0,0 +1,293 @@
+"""
+Background dispatcher: drains the DispatchJob queue filled by /send, and
+(in a second thread) the WebhookInbox filled by /webhook.
+
+Run it next to gunicorn (same env vars / DATABASE_URL as the web app):
+
+    python dispatcher.py
+
+Several dispatchers can run at once; each job is claimed by exactly one.
+If a dispatcher dies, its job is re-claimed once the heartbeat goes stale
+(DISPATCH_STALE_SECONDS) and only unsent recipients are sent. Recipients are
+stamped with the claiming run before they are sent, so a dispatcher that lost
+its job to another one can never send the same rows.
+"""
+import os, socket, threading, time, uuid
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from sqlalchemy import update
+
+from app import (app, db, MessageRecord, History, DispatchJob, claim_dispatch_job,
+                 send_whatsapp_batch, send_result_fields, apply_send_results, rate_limiter, sender_pool, CampaignPayload,
+                 process_webhook_inbox, purge_done_inbox, interrupt_orphaned_in_flight, metrics, message_cache, sendable_recipients_filter, send_slice,
+                 suppressed_among, suppress_numbers, suppression_for_error, record_last_outbound,
+                 DISPATCH_POLL_SECONDS, DISPATCH_CHUNK_SIZE, WEBHOOK_POLL_SECONDS, SCHEDULE_SLICE_SECONDS,
+                 WA_BACKOFF_MAX_SECONDS, DISPATCH_HEARTBEAT_SECONDS)
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+# the dispatcher serves its own endpoint below; keep its counters out of the web workers' METRICS_DIR
+metrics.directory = None
+# Prometheus scrape port for this dispatcher's metrics (0 = disabled)
+DISPATCHER_METRICS_PORT = int(os.environ.get("DISPATCHER_METRICS_PORT", "9101"))
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass   # no access log per scrape
+
+
+def start_metrics_server(port):
+    server = ThreadingHTTPServer(('0.0.0.0', port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"[dispatcher] metrics on :{port}/metrics")
+
+
+class JobHeartbeat:
+    """
+    Refreshes a running job's heartbeat_at from a background thread, so a long
+    chunk (slow API, big backoff) never looks stale to other dispatchers.
+    The UPDATE only matches while this worker still owns the job; once it
+    doesn't, `lost` is set and the dispatch loop stops before the next chunk.
+    """
+
+    def __init__(self, engine, job_id, worker_id, interval=DISPATCH_HEARTBEAT_SECONDS):
+        self.engine = engine
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.interval = interval
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{job_id}", daemon=True)
+
+    def beat(self):
+        stmt = (update(DispatchJob)
+                .where(DispatchJob.id == self.job_id, DispatchJob.worker == self.worker_id,
+                       DispatchJob.status == 'running')
+                .values(heartbeat_at=datetime.utcnow()))
+        with self.engine.begin() as conn:
+            if conn.execute(stmt).rowcount == 0:
+                self.lost.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.beat()
+            except Exception as e:
+                # a missed beat is fine; the next one (or DISPATCH_STALE_SECONDS) covers it
+                print(f"[dispatcher] heartbeat for job {self.job_id} failed: {e}")
+            if self.lost.is_set():
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def dispatch_job(job):
+    """Send every pending MessageRecord of the job's campaign.
+    Recipients are sharded over the sender numbers by sender_pool; within a
+    chunk up to DISPATCH_MAX_IN_FLIGHT messages per sender are in flight at once.
+    Results are written back with guarded set-based UPDATEs (a webhook that
+    already advanced a record is never undone) and one commit per chunk.
+    Campaigns with send windows or a max_per_hour budget are sent in passes:
+    each pass sends what is allowed right now, then the job goes back to the
+    queue with not_before set to the next slice, freeing the dispatcher."""
+    with JobHeartbeat(db.engine, job.id, job.worker) as heartbeat:
+        run_job(job, heartbeat)
+
+
+def run_job(job, heartbeat):
+    hist = db.session.get(History, job.history_id)
+    if hist is None:
+        job.status = 'failed'
+        job.error_message = 'Campaign no longer exists'
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        return
+
+    # re-claimed after a crash: whatever was mid-request may or may not have been
+    # sent, so never send it again automatically (see resume_campaign)
+    MessageRecord.query.filter_by(history_id=hist.id, status='in_flight').update(
+        {'status': 'interrupted'}, synchronize_session=False)
+    db.session.commit()
+
+    title, body, img = hist.message_title, hist.message_body, hist.google_drive_link
+    # built once per campaign: header image uploaded once per sender, JSON serialized once
+    payload = CampaignPayload(img)
+    sent = failed = skipped = throttled = 0
+    last_id = 0
+    pass_start = datetime.utcnow()
+    budget = send_slice(hist)
+    metered = budget is not None or sendable_recipients_filter() is not None
+    # rows this run moves to in_flight are stamped with it (MessageRecord.claimed_by)
+    run_token = f"{job.worker}:{uuid.uuid4().hex[:8]}"
+    while True:
+        if heartbeat.lost.is_set():
+            # another dispatcher re-claimed the job; it owns the remaining rows now
+            print(f"[dispatcher] campaign {hist.id}: lost job {job.id} to another dispatcher, stopping")
+            return
+        limit = DISPATCH_CHUNK_SIZE if budget is None else min(DISPATCH_CHUNK_SIZE, budget - sent - failed - throttled)
+        if limit <= 0:
+            break
+        # keyset over ids so each chunk is a cheap indexed range scan
+        query = (db.session.query(MessageRecord.id, MessageRecord.phone_number, MessageRecord.idempotency_key)
+                 .filter(MessageRecord.history_id == hist.id,
+                         MessageRecord.status == 'pending',
+                         MessageRecord.id > last_id))
+        # recomputed per chunk, so a window closing mid-pass is respected
+        in_window = sendable_recipients_filter()
+        if in_window is not None:
+            query = query.filter(in_window)
+        chunk = query.order_by(MessageRecord.id).limit(limit).all()
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+
+        # numbers suppressed after this campaign was queued (opt-outs, dead numbers)
+        blocked = suppressed_among([row.phone_number for row in chunk])
+        if blocked:
+            apply_send_results([
+                {'id': row.id, 'status': 'failed', 'error_message': f"Suppressed: {blocked[row.phone_number]}"}
+                for row in chunk if row.phone_number in blocked])
+            skipped += len(blocked)
+            chunk = [row for row in chunk if row.phone_number not in blocked]
+            if not chunk:
+                db.session.commit()
+                continue
+        # pending -> in_flight is committed before any request goes out, so a
+        # crash can only leave this one chunk in an unknown state
+        ids = [row.id for row in chunk]
+        MessageRecord.query.filter(MessageRecord.id.in_(ids), MessageRecord.status == 'pending').update(
+            {'status': 'in_flight', 'claimed_by': run_token}, synchronize_session=False)
+        db.session.commit()
+        # only send what this run actually claimed; a dispatcher racing on the
+        # same job may have taken some (or all) of these rows
+        owned = {row.id for row in db.session.query(MessageRecord.id).filter(
+            MessageRecord.id.in_(ids), MessageRecord.status == 'in_flight',
+            MessageRecord.claimed_by == run_token)}
+        if len(owned) < len(chunk):
+            chunk = [row for row in chunk if row.id in owned]
+            if not chunk:
+                continue
+
+        # API calls run concurrently; DB writes stay on this thread
+        senders = [sender_pool.sender_for(row.phone_number) for row in chunk]
+        results = send_whatsapp_batch([row.phone_number for row in chunk], title, body, img,
+                                      callback_data=[row.idempotency_key for row in chunk],
+                                      senders=senders, payload=payload)
+        updates = []
+        suppress = {}
+        for row, resp, sender in zip(chunk, results, senders):
+            fields = send_result_fields(resp)
+            fields['id'] = row.id
+            fields['sender_phone_number_id'] = sender.phone_number_id
+            updates.append(fields)
+            if fields['status'] == 'sent':
+                sent += 1
+            elif fields['status'] == 'pending':
+                throttled += 1   # still throttled after all retries, stays pending
+            else:
+                failed += 1
+                entry = suppression_for_error(resp.get('error'))
+                if entry:
+                    suppress[row.phone_number] = entry
+        apply_send_results(updates)
+        record_last_outbound([
+            {'phone_number': row.phone_number, 'message_id': row.id,
+             'whatsapp_message_id': fields['whatsapp_message_id'], 'sent_at': fields['sent_at']}
+            for row, fields in zip(chunk, updates) if fields['status'] == 'sent'])
+        suppress_numbers(suppress)
+        db.session.commit()
+        # the inbox thread in this process can now resolve these ids without a query;
+        # a state the inbox already cached for the id is further along, keep it
+        for fields in updates:
+            if fields['status'] == 'sent':
+                message_cache.put(fields['whatsapp_message_id'], fields['id'],
+                                  {'status': 'sent', 'delivered': False, 'seen': False, 'replied': False},
+                                  overwrite=False)
+        print(f"[dispatcher] campaign {hist.id}: {sent} sent, {failed} failed, {throttled} left throttled, "
+              f"{rate_limiter.current_rate():.1f} msg/s, {rate_limiter.throttled} throttled responses")
+
+    if heartbeat.lost.is_set():
+        print(f"[dispatcher] campaign {hist.id}: lost job {job.id} to another dispatcher, stopping")
+        return
+    if db.session.query(MessageRecord.id).filter_by(history_id=hist.id, status='pending').first():
+        # budget used up, remaining countries outside their window, or rows still
+        # throttled after all retries: come back later instead of finishing
+        job.status = 'queued'
+        job.worker = None
+        if metered:
+            job.not_before = pass_start + timedelta(seconds=SCHEDULE_SLICE_SECONDS)
+        else:
+            job.not_before = datetime.utcnow() + timedelta(seconds=WA_BACKOFF_MAX_SECONDS)
+        db.session.commit()
+        print(f"[dispatcher] campaign {hist.id}: pass sent {sent}, failed {failed}, {throttled} left throttled; "
+              f"next pass at {job.not_before} UTC")
+        return
+
+    job.status = 'done'
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    print(f"[dispatcher] campaign {hist.id} done: {sent} sent, {failed} failed, {skipped} suppressed")
+
+
+def drain_webhook_inbox_forever():
+    """Apply queued webhook payloads in batches; sleeps only when the inbox is empty."""
+    while True:
+        with app.app_context():
+            try:
+                n = process_webhook_inbox(WORKER_ID)
+                if not n:
+                    # idle: clear applied payloads older versions left behind
+                    n = purge_done_inbox()
+            except Exception as e:
+                db.session.rollback()
+                print(f"[dispatcher] webhook inbox error: {e}")
+                n = 0
+            finally:
+                db.session.remove()
+        if not n:
+            time.sleep(WEBHOOK_POLL_SECONDS)
+
+
+def run_forever():
+    print(f"[dispatcher] {WORKER_ID} polling every {DISPATCH_POLL_SECONDS}s")
+    threading.Thread(target=drain_webhook_inbox_forever, name="webhook-inbox", daemon=True).start()
+    if DISPATCHER_METRICS_PORT:
+        start_metrics_server(DISPATCHER_METRICS_PORT)
+    while True:
+        with app.app_context():
+            job = claim_dispatch_job(WORKER_ID)
+            if job is None:
+                db.session.remove()
+                time.sleep(DISPATCH_POLL_SECONDS)
+                continue
+            try:
+                dispatch_job(job)
+            except Exception as e:
+                db.session.rollback()
+                print(f"[dispatcher] job {job.id} crashed: {e}")
+                DispatchJob.query.filter_by(id=job.id).update(
+                    {'status': 'failed', 'error_message': str(e), 'finished_at': datetime.utcnow()},
+                    synchronize_session=False)
+                # rows of the chunk that was in flight would otherwise stay in_flight forever
+                interrupt_orphaned_in_flight(job.history_id)
+                db.session.commit()
+            finally:
+                db.session.remove()
+
+
+if __name__ == "__main__":
+    run_forever()
@@ -0,0 +1,57 @@
+"""
+Gunicorn runtime profile (picked up automatically from the working directory,
+or pass -c gunicorn.conf.py). Everything is overridable with env vars.
+
+/send, /webhook and the SSE progress stream mostly wait on the DB and network,
+so the default is a few processes with many threads each ("gthread").
+GUNICORN_WORKER_CLASS=gevent is also supported (pip install gevent).
+
+Keep DB_POOL_SIZE + DB_MAX_OVERFLOW >= GUNICORN_THREADS, and workers * that
+below MySQL's max_connections (the dispatcher needs a few more).
+
+/metrics sums the counters of every worker through METRICS_DIR, so one scrape
+of the shared port sees the totals whichever worker answers.
+"""
+import multiprocessing, os, tempfile
+
+import metrics_store
+
+bind = os.environ.get("GUNICORN_BIND", f"0.0.0.0:{os.environ.get('PORT', '5000')}")
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.environ.get("GUNICORN_WORKERS", str(min(multiprocessing.cpu_count() * 2 + 1, 8))))
+threads = int(os.environ.get("GUNICORN_THREADS", "8"))
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", "200"))   # gevent only
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", "5"))
+# recycle workers now and then so slow leaks (big uploads, report renders) don't pile up
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+accesslog = os.environ.get("GUNICORN_ACCESSLOG", "-")
+# per-worker metric snapshots, summed by /metrics (one directory per server)
+os.environ.setdefault("METRICS_DIR", os.path.join(tempfile.gettempdir(), f"wa-metrics-{bind.rsplit(':', 1)[-1]}"))
+
+# Load the app once in the master: the startup check and migrations then run
+# once instead of racing in every worker. gevent has to patch before the app
+# is imported, so it loads per worker instead.
+preload_app = worker_class != "gevent"
+
+
+def on_starting(server):
+    # a fresh server starts its counters at zero
+    metrics_store.reset(os.environ["METRICS_DIR"])
+
+
+def child_exit(server, worker):
+    # keep a recycled worker's counts (max_requests) so totals never go backwards
+    metrics_store.fold(os.environ["METRICS_DIR"], worker.pid)
+
+
+def post_fork(server, worker):
+    # connections opened in the master (startup check, migrations) must not be
+    # shared by the forked workers; each worker builds its own pool
+    if not preload_app:
+        return
+    import app
+    with app.app.app_context():
+        app.db.engine.dispose(close=False)
@@ -0,0 +1,90 @@
+"""
+Shared metrics directory for multi-process web servers (gunicorn workers).
+
+Each process writes a snapshot of its counters / histograms to
+<dir>/<pid>.json; /metrics sums every snapshot, so a scrape sees the totals
+of all workers no matter which one answers. When a worker exits, the master
+folds its snapshot into archive.json, so totals never go backwards when
+workers are recycled.
+
+Kept free of Flask / DB imports so the gunicorn master can use it without
+importing the app (gevent workers must patch before the app is imported).
+
+Snapshot format: {"counters": {key: value}, "histograms": {key: [bucket counts..., sum, count]}}
+where key is json.dumps([name, [[label, value], ...]]).
+"""
+import fcntl, glob, json, os
+from contextlib import contextmanager
+
+ARCHIVE = 'archive.json'
+
+
+@contextmanager
+def _locked(directory, exclusive):
+    # readers take a shared lock so they never see a dead worker both in its
+    # own file and in the archive (or in neither)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, '.lock'), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write(path, snap):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(snap, f)
+    os.replace(tmp, path)
+
+
+def merge(snaps):
+    """Sum snapshots: counters add up, histogram buckets / sum / count add up element-wise."""
+    total = {'counters': {}, 'histograms': {}}
+    for snap in snaps:
+        for key, value in snap.get('counters', {}).items():
+            total['counters'][key] = total['counters'].get(key, 0) + value
+        for key, values in snap.get('histograms', {}).items():
+            cur = total['histograms'].get(key)
+            total['histograms'][key] = list(values) if cur is None else [a + b for a, b in zip(cur, values)]
+    return total
+
+
+def write_snapshot(directory, pid, snap):
+    os.makedirs(directory, exist_ok=True)
+    _write(os.path.join(directory, f"{pid}.json"), snap)
+
+
+def read_merged(directory):
+    """Merged snapshot of every process in `directory`, exited ones (the archive) included."""
+    with _locked(directory, exclusive=False):
+        snaps = [_read(p) for p in glob.glob(os.path.join(directory, '*.json'))]
+    return merge(s for s in snaps if s)
+
+
+def fold(directory, pid):
+    """Move an exited process's snapshot into the archive."""
+    path = os.path.join(directory, f"{pid}.json")
+    with _locked(directory, exclusive=True):
+        snap = _read(path)
+        if snap is None:
+            return
+        archive = os.path.join(directory, ARCHIVE)
+        _write(archive, merge([_read(archive) or {}, snap]))
+        os.remove(path)
+
+
+def reset(directory):
+    """Start from zero (server start): drop snapshots left by a previous run."""
+    with _locked(directory, exclusive=True):
+        for path in glob.glob(os.path.join(directory, '*.json')):
+            os.remove(path)
@@ -0,0 +1,140 @@
+"""
+Local stand-in for the WhatsApp Cloud API, for offline load tests.
+
+    python mock_graph.py --port 8900 --latency-ms 80 --error-rate 0.01 \
+        --throttle-rate 0.005 --webhook-url http://localhost:5000/webhook
+
+then run the app / dispatcher with WHATSAPP_GRAPH_URL=http://localhost:8900.
+Accepted messages get a wamid; with --webhook-url set, sent / delivered / read
+status webhooks are posted back to the app like Meta would. /_media/header.png
+serves a tiny image that can be used as the campaign's header image link.
+"""
+import argparse, base64, queue, random, threading, time, uuid
+
+import requests
+from flask import Flask, request, jsonify
+
+mock = Flask(__name__)
+
+CONFIG = {
+    'latency_ms': 50.0,       # mean response latency
+    'jitter_ms': 20.0,        # +/- uniform jitter on top of latency
+    'error_rate': 0.0,        # fraction answered with a permanent error (131026)
+    'throttle_rate': 0.0,     # fraction answered with a throughput throttle (130429)
+    'webhook_url': None,      # where to POST status webhooks, if anywhere
+    'webhook_delay_ms': 200.0,
+    'read_rate': 0.5,         # fraction of delivered messages that also get 'read'
+}
+
+STATS = {'requests': 0, 'accepted': 0, 'errors': 0, 'throttled': 0, 'media_uploads': 0}
+# 1x1 PNG
+HEADER_PNG = base64.b64decode('iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg==')
+_stats_lock = threading.Lock()
+_webhooks = queue.Queue()
+
+
+def status_payload(wamid, recipient, status, phone_number_id, callback_data=None):
+    """A status webhook body shaped like Meta's."""
+    st = {'id': wamid, 'status': status, 'timestamp': str(int(time.time())), 'recipient_id': recipient}
+    if callback_data:
+        st['biz_opaque_callback_data'] = callback_data
+    if status == 'failed':
+        st['errors'] = [{'code': 131026, 'title': 'Message undeliverable', 'message': 'Message undeliverable'}]
+    return {
+        'object': 'whatsapp_business_account',
+        'entry': [{'id': 'mock-waba', 'changes': [{'field': 'messages', 'value': {
+            'messaging_product': 'whatsapp',
+            'metadata': {'display_phone_number': '15550000000', 'phone_number_id': phone_number_id},
+            'statuses': [st],
+        }}]}],
+    }
+
+
+def _count(key):
+    with _stats_lock:
+        STATS[key] += 1
+
+
+@mock.route('/<phone_number_id>/messages', methods=['POST'])
+def messages(phone_number_id):
+    _count('requests')
+    delay = CONFIG['latency_ms'] + random.uniform(-CONFIG['jitter_ms'], CONFIG['jitter_ms'])
+    time.sleep(max(delay, 0) / 1000.0)
+
+    body = request.get_json(silent=True) or {}
+    to = body.get('to')
+    roll = random.random()
+    if roll < CONFIG['throttle_rate']:
+        _count('throttled')
+        return jsonify(error={'message': '(#130429) Rate limit hit', 'type': 'OAuthException', 'code': 130429}), 400
+    if roll < CONFIG['throttle_rate'] + CONFIG['error_rate']:
+        _count('errors')
+        return jsonify(error={'message': '(#131026) Message undeliverable', 'type': 'OAuthException', 'code': 131026}), 400
+
+    _count('accepted')
+    wamid = f"wamid.MOCK{uuid.uuid4().hex}"
+    if CONFIG['webhook_url']:
+        _webhooks.put((time.monotonic() + CONFIG['webhook_delay_ms'] / 1000.0,
+                       wamid, to, phone_number_id, body.get('biz_opaque_callback_data')))
+    return jsonify(messaging_product='whatsapp', contacts=[{'input': to, 'wa_id': to}], messages=[{'id': wamid}])
+
+
+@mock.route('/<phone_number_id>/media', methods=['POST'])
+def media(phone_number_id):
+    if 'file' not in request.files:
+        return jsonify(error={'message': '(#100) file is required', 'type': 'OAuthException', 'code': 100}), 400
+    _count('media_uploads')
+    return jsonify(id=f"MOCKMEDIA{uuid.uuid4().hex[:16]}")
+
+
+@mock.route('/_media/header.png')
+def header_image():
+    return HEADER_PNG, 200, {'Content-Type': 'image/png'}
+
+
+@mock.route('/_stats')
+def stats():
+    with _stats_lock:
+        return jsonify(STATS)
+
+
+def _webhook_sender():
+    """Posts sent -> delivered -> (read) for each accepted message, after webhook_delay_ms."""
+    session = requests.Session()
+    while True:
+        due, wamid, to, phone_id, cb = _webhooks.get()
+        time.sleep(max(0, due - time.monotonic()))
+        statuses = ['sent', 'delivered'] + (['read'] if random.random() < CONFIG['read_rate'] else [])
+        for st in statuses:
+            try:
+                session.post(CONFIG['webhook_url'], json=status_payload(wamid, to, st, phone_id, cb), timeout=10)
+            except requests.RequestException as e:
+                print(f"[mock] webhook post failed: {e}")
+
+
+def start_webhook_sender(threads=4):
+    for i in range(threads):
+        threading.Thread(target=_webhook_sender, name=f"mock-webhook-{i}", daemon=True).start()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--host', default='127.0.0.1')
+    ap.add_argument('--port', type=int, default=8900)
+    ap.add_argument('--latency-ms', type=float, default=CONFIG['latency_ms'])
+    ap.add_argument('--jitter-ms', type=float, default=CONFIG['jitter_ms'])
+    ap.add_argument('--error-rate', type=float, default=CONFIG['error_rate'])
+    ap.add_argument('--throttle-rate', type=float, default=CONFIG['throttle_rate'])
+    ap.add_argument('--webhook-url', default=None)
+    ap.add_argument('--webhook-delay-ms', type=float, default=CONFIG['webhook_delay_ms'])
+    ap.add_argument('--read-rate', type=float, default=CONFIG['read_rate'])
+    args = ap.parse_args()
+    for key in ('latency_ms', 'jitter_ms', 'error_rate', 'throttle_rate', 'webhook_url', 'webhook_delay_ms', 'read_rate'):
+        CONFIG[key] = getattr(args, key)
+    if CONFIG['webhook_url']:
+        start_webhook_sender()
+    mock.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Pure PDF rendering for campaign reports.
+
+Kept free of Flask / DB imports so it can run inside a process pool
+(see export_all_reports in app.py) without re-importing the web app.
+"""
+import io
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.lib.units import inch
+
+
+def render_report_pdf(data):
+    """
+    Build the report PDF and return its bytes.
+    `data` is a plain dict (see app.report_inputs): history_title, message_title,
+    message_body, created_at (preformatted string) and stats (campaign_stats()).
+    """
+    stats = data['stats']
+    total_attempted = stats['total']
+    if total_attempted == 0:
+        buf = io.BytesIO()
+        doc = SimpleDocTemplate(buf, pagesize=A4)
+        styles = getSampleStyleSheet()
+        doc.build([Paragraph("No messages sent.", styles['Heading1'])])
+        return buf.getvalue()
+
+    delivered = stats['delivered']
+    seen = stats['seen']
+    replied = stats['replied']
+    failed = stats['failed']
+
+    # avoid division by zero
+    denom = total_attempted or 1
+
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(buf, pagesize=A4, topMargin=inch)
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle('Title', parent=styles['Heading1'], fontSize=20, alignment=1)
+    story = [
+        Paragraph("WhatsApp Campaign Report", title_style),
+        Spacer(1, 12),
+        Paragraph("Campaign Details", styles['Heading2']),
+        Table([
+            ['Title:', data['history_title']],
+            ['Message:', data['message_title']],
+            ['Sent At:', data['created_at']],
+            ['Recipients (attempted):', str(total_attempted)]
+        ], colWidths=[2*inch, 4.0*inch], style=[('GRID', (0,0), (-1,-1), 1, colors.black)]),
+        Spacer(1, 12),
+        Paragraph("Delivery Statistics", styles['Heading2']),
+        Table([
+            ['Metric','Count','%'],
+            ['Sent (attempted)', str(total_attempted), f"{(total_attempted/denom)*100:.1f}%"],
+            ['Delivered', str(delivered), f"{delivered/denom*100:.1f}%"],
+            ['Seen', str(seen), f"{seen/denom*100:.1f}%"],
+            ['Replied', str(replied), f"{replied/denom*100:.1f}%"],
+            ['Failed', str(failed), f"{failed/denom*100:.1f}%"]
+        ], colWidths=[2.0*inch,1.2*inch,1.3*inch], style=[
+            ('GRID',(0,0),(-1,-1),1,colors.black),
+            ('BACKGROUND',(0,0),(-1,0),colors.darkblue),
+            ('TEXTCOLOR',(0,0),(-1,0),colors.whitesmoke)
+        ]),
+        Spacer(1, 12),
+        Paragraph("Message Body", styles['Heading2']),
+        Paragraph(data['message_body'], styles['Normal'])
+    ]
+    doc.build(story)
+    return buf.getvalue()
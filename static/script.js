@@ -4,16 +4,33 @@ if (sendForm) {
   sendForm.addEventListener("submit", async e => {
     e.preventDefault();
     const statusDiv = document.getElementById("status");
-    statusDiv.textContent = "Sending messages...";
+    statusDiv.textContent = "Queueing campaign...";
     const formData = new FormData(sendForm);
+    // datetime-local is the browser's local time; the server expects UTC
+    const startAt = formData.get("scheduled_at");
+    if (startAt) formData.set("scheduled_at", new Date(startAt).toISOString());
 
     try {
       const res = await fetch("/send", { method: "POST", body: formData });
       const data = await res.json();
       statusDiv.textContent = "";
       if (data.status === "success") {
-        data.messages.forEach(msg => appendStatus(msg));
-        setTimeout(() => location.reload(), 2000);
+        appendStatus(`Campaign #${data.campaign_id} queued: ${data.queued} recipients. Sending in background.`);
+        if (data.scheduled_at) appendStatus(`Starts at ${new Date(data.scheduled_at).toLocaleString()}.`);
+        if (data.max_per_hour) appendStatus(`Limited to ${data.max_per_hour} messages per hour.`);
+        if (data.suppressed) appendStatus(`Left out ${data.suppressed} suppressed numbers (opted out or undeliverable).`);
+        if (data.skipped) appendStatus(`Skipped ${data.skipped.count} invalid numbers.`);
+        const line = document.createElement("p");
+        statusDiv.appendChild(line);
+        watchProgress(data.campaign_id, p => {
+          line.textContent = `Queued ${p.queued} · Sent ${p.sent} · Failed ${p.failed} · Delivered ${p.delivered} · Read ${p.seen}`;
+        }, d => {
+          if (d.state === "scheduled") {
+            line.textContent += ` · Next pass at ${new Date(d.next_pass).toLocaleString()}`;
+          } else {
+            location.reload();
+          }
+        });
       } else {
         appendStatus("Error: " + data.message);
       }
@@ -23,6 +40,18 @@ if (sendForm) {
   });
 }
 
+// --- Live campaign progress (Server-Sent Events from /progress/<id>) ---
+function watchProgress(historyId, onUpdate, onDone) {
+  if (!window.EventSource) return null;
+  const es = new EventSource(`/progress/${historyId}`);
+  es.onmessage = e => onUpdate(JSON.parse(e.data));
+  es.addEventListener("done", e => {
+    es.close();
+    if (onDone) onDone(JSON.parse(e.data || "{}"));
+  });
+  return es;
+}
+
 // --- Append Status Function ---
 function appendStatus(msg) {
   const statusDiv = document.getElementById("status");
@@ -71,8 +100,8 @@ async function downloadReport(historyId) {
 }
 
 // --- Refill Buttons ---
-function attachRefillButtons() {
-  document.querySelectorAll(".refillBtn").forEach(btn => {
+function attachRefillButtons(root = document) {
+  root.querySelectorAll(".refillBtn").forEach(btn => {
     btn.addEventListener("click", async () => {
       const id = btn.dataset.id;
       try {
@@ -83,7 +112,12 @@ function attachRefillButtons() {
           document.querySelector('input[name="message_title"]').value = data.message_title;
           document.querySelector('textarea[name="message_body"]').value = data.message_body;
           document.querySelector('input[name="google_drive_link"]').value = data.google_drive_link;
-          document.querySelector('textarea[name="phone_numbers_csv"]').value = data.phone_numbers_csv;
+          let numbers = data.phone_numbers_csv || "";
+          if (data.numbers_url) {
+            const numRes = await fetch(data.numbers_url);
+            numbers = await numRes.text();
+          }
+          document.querySelector('textarea[name="phone_numbers_csv"]').value = numbers;
           document.getElementById("excel_file").value = "";
           alert("Form refilled from history!");
           sendForm.scrollIntoView({ behavior: "smooth" });
@@ -98,8 +132,8 @@ function attachRefillButtons() {
 }
 
 // --- Delete Buttons ---
-function attachDeleteButtons() {
-  document.querySelectorAll(".deleteBtn").forEach(btn => {
+function attachDeleteButtons(root = document) {
+  root.querySelectorAll(".deleteBtn").forEach(btn => {
     btn.addEventListener("click", async () => {
       const id = btn.dataset.id;
       const title = btn.closest("tr").querySelector("td:nth-child(2)").textContent;
@@ -120,32 +154,77 @@ function attachDeleteButtons() {
   });
 }
 
-// --- Pagination ---
-let currentPage = 1;
-const rowsPerPage = 10;
+// --- History: infinite scroll (keyset pages from /history) ---
 const tableBody = document.getElementById("historyTableBody");
-const pageInfo = document.getElementById("pageInfo");
-const prevBtn = document.getElementById("prevPage");
-const nextBtn = document.getElementById("nextPage");
-
-function showPage(page) {
-  const rows = Array.from(tableBody.querySelectorAll("tr"));
-  const totalPages = Math.ceil(rows.length / rowsPerPage);
-  rows.forEach((row, i) => {
-    row.style.display = i >= (page-1)*rowsPerPage && i < page*rowsPerPage ? "" : "none";
+const loadMoreBtn = document.getElementById("loadMore");
+let loadingHistory = false;
+
+function historyRow(rec) {
+  const tr = document.createElement("tr");
+  tr.dataset.id = rec.id;
+  [rec.id, rec.history_title, rec.message_title, rec.message_body].forEach((val, i) => {
+    const td = document.createElement("td");
+    td.textContent = val;
+    if (i === 3) td.className = "message-body";
+    tr.appendChild(td);
   });
-  pageInfo.textContent = `Page ${page} of ${totalPages}`;
-  prevBtn.disabled = page === 1;
-  nextBtn.disabled = page === totalPages;
+  const linkTd = document.createElement("td");
+  if (rec.google_drive_link) {
+    const a = document.createElement("a");
+    a.href = rec.google_drive_link;
+    a.target = "_blank";
+    a.className = "view-link";
+    a.textContent = "View";
+    linkTd.appendChild(a);
+  } else {
+    linkTd.innerHTML = '<span class="no-image">No Image</span>';
+  }
+  tr.appendChild(linkTd);
+  const actions = document.createElement("td");
+  actions.className = "actions-cell";
+  actions.innerHTML = `
+    <button type="button" class="refillBtn action-btn" data-id="${rec.id}" title="Refill Form">📝</button>
+    <a href="/report/${rec.id}" class="downloadBtn action-btn" title="View Report">📊</a>
+    <button type="button" class="deleteBtn action-btn delete" data-id="${rec.id}" title="Delete Record">🗑️</button>`;
+  tr.appendChild(actions);
+  return tr;
+}
+
+async function loadMoreHistory() {
+  if (loadingHistory || !loadMoreBtn || !loadMoreBtn.dataset.before) return;
+  loadingHistory = true;
+  try {
+    const res = await fetch(`/history?before=${loadMoreBtn.dataset.before}`);
+    const data = await res.json();
+    const frag = document.createElement("tbody");
+    data.items.forEach(rec => frag.appendChild(historyRow(rec)));
+    attachRefillButtons(frag);
+    attachDeleteButtons(frag);
+    while (frag.firstChild) tableBody.appendChild(frag.firstChild);
+    if (data.next_before) {
+      loadMoreBtn.dataset.before = data.next_before;
+    } else {
+      loadMoreBtn.remove();
+    }
+  } catch (err) {
+    appendStatus("Error loading history: " + err);
+  } finally {
+    loadingHistory = false;
+  }
 }
 
 if (tableBody) {
-  showPage(currentPage);
-  prevBtn.addEventListener("click", () => { if (currentPage>1) showPage(--currentPage); });
-  nextBtn.addEventListener("click", () => {
-    const totalPages = Math.ceil(tableBody.querySelectorAll("tr").length/rowsPerPage);
-    if (currentPage<totalPages) showPage(++currentPage);
-  });
+  attachRefillButtons(tableBody);
+  attachDeleteButtons(tableBody);
+}
+if (loadMoreBtn) {
+  loadMoreBtn.addEventListener("click", loadMoreHistory);
+  // load the next page automatically when the button scrolls into view
+  if ("IntersectionObserver" in window) {
+    new IntersectionObserver(entries => {
+      if (entries.some(e => e.isIntersecting)) loadMoreHistory();
+    }).observe(loadMoreBtn);
+  }
 }
 
 // --- Report Page Buttons ---
@@ -169,6 +248,35 @@ if (downloadPdfBtn) {
 }
 
 
+// live-update the report numbers while the campaign is still sending
+if (typeof DOCUMENT_HISTORY_ID !== "undefined" && document.querySelector("[data-stat]")) {
+  watchProgress(DOCUMENT_HISTORY_ID, p => {
+    document.querySelectorAll("[data-stat]").forEach(el => {
+      if (el.dataset.stat in p) el.textContent = p[el.dataset.stat];
+    });
+  });
+}
+
+const resumeBtn = document.getElementById("btnResume");
+if (resumeBtn) {
+  resumeBtn.addEventListener("click", async () => {
+    try {
+      let res = await fetch(`/resume/${DOCUMENT_HISTORY_ID}`, { method: "POST" });
+      let data = await res.json();
+      if (data.interrupted && confirm(`${data.interrupted} messages were interrupted mid-send and may already have been delivered. Send them again?`)) {
+        res = await fetch(`/resume/${DOCUMENT_HISTORY_ID}?retry_interrupted=1`, { method: "POST" });
+        data = await res.json();
+      }
+      if (data.status === "success") {
+        appendStatus(data.pending ? `Resumed: ${data.pending} unsent messages queued.` : "Nothing left to send.");
+      } else {
+        appendStatus("Error: " + data.message);
+      }
+    } catch (err) {
+      appendStatus("Error: " + err);
+    }
+  });
+}
 
 // --- Auto-save form data ---
 const formElements = ['phone_numbers_csv','message_title','message_body','google_drive_link','history_title'];